@@ -0,0 +1,92 @@
+"""Measure upload classification latency per file type.
+
+Local part: the extension lookup (old per-category scan vs. the
+precomputed table) and magic-byte classification of a SNIFF_BYTES head
+for each supported type.
+
+Live part, when BOT_TOKEN is real and BENCH_FILE_IDS lists Telegram
+file_ids (comma separated): end-to-end sniff latency including
+getFile and the ranged download.
+
+    python benchmarks/bench_classify.py
+"""
+import os
+import sys
+import time
+import asyncio
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+os.environ.setdefault('BOT_TOKEN', '123456:bench')
+
+from config import Config
+from file_manager import FileManager, detect_extension
+
+ITERATIONS = 20000
+
+SAMPLES = {
+    'photo.jpg': b'\xff\xd8\xff\xe0\x00\x10JFIF',
+    'image.png': b'\x89PNG\r\n\x1a\n\x00\x00\x00\rIHDR',
+    'report.pdf': b'%PDF-1.7\n',
+    'letter.docx': b'PK\x03\x04\x14\x00\x06\x00',
+    'backup.7z': b"7z\xbc\xaf'\x1c\x00\x04",
+    'song.mp3': b'ID3\x04\x00\x00\x00\x00',
+    'clip.mp4': b'\x00\x00\x00\x20ftypisom\x00\x00\x02\x00',
+    'movie.mkv': b'\x1aE\xdf\xa3\x9fB\x86\x81',
+    'notes.txt': 'plain text notes ✓\n'.encode('utf-8'),
+}
+
+
+def old_is_file_allowed(file_name):
+    ext = os.path.splitext(file_name)[1].lower()
+    for category, extensions in Config.ALLOWED_EXTENSIONS.items():
+        if ext in extensions:
+            return True, category
+    return False, 'unknown'
+
+
+def per_call_us(func, *args):
+    started = time.perf_counter()
+    for _ in range(ITERATIONS):
+        func(*args)
+    return (time.perf_counter() - started) / ITERATIONS * 1e6
+
+
+async def live(file_manager, file_ids):
+    from telegram import Bot
+
+    async with Bot(Config.BOT_TOKEN) as bot:
+        for file_id in file_ids:
+            started = time.perf_counter()
+            head = await file_manager.fetch_head(bot, file_id, Config.SNIFF_BYTES)
+            result = detect_extension(head)
+            elapsed = (time.perf_counter() - started) * 1000
+            print(f"{file_id[:24]:<26}{elapsed:9.1f} ms  {len(head)} bytes  {result}")
+    await file_manager.close()
+
+
+def main():
+    file_manager = FileManager()
+
+    print(f"{'file':<14}{'ext scan':>12}{'ext table':>12}{'magic bytes':>14}  result")
+    for file_name, magic in SAMPLES.items():
+        head = magic.ljust(Config.SNIFF_BYTES, b' ') if file_name.endswith('.txt') else \
+            magic + b'\x00' * (Config.SNIFF_BYTES - len(magic))
+        print(
+            f"{file_name:<14}"
+            f"{per_call_us(old_is_file_allowed, file_name):9.2f} us"
+            f"{per_call_us(file_manager.is_file_allowed, file_name):9.2f} us"
+            f"{per_call_us(file_manager.classify_head, head, file_name):11.2f} us"
+            f"  {file_manager.classify_head(head, file_name)[2]}"
+        )
+    print(f"bytes fetched per sniff: {Config.SNIFF_BYTES} "
+          f"(vs up to {Config.MAX_FILE_SIZE} for a full download)")
+
+    file_ids = [f for f in os.getenv('BENCH_FILE_IDS', '').split(',') if f]
+    if file_ids:
+        asyncio.run(live(file_manager, file_ids))
+    else:
+        print("live sniff latency: set BOT_TOKEN and BENCH_FILE_IDS to measure")
+
+
+if __name__ == '__main__':
+    main()
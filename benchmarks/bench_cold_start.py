@@ -0,0 +1,161 @@
+"""Measure cold-start costs of the serverless entry point.
+
+Every measurement runs in a fresh interpreter so nothing is cached:
+
+- import time of serverless, config and bot
+- Database() start-up on a new file versus one whose schema marker matches
+- time to first reply: a /start update is fed to serverless.py while a
+  local stand-in for the Bot API (via BOT_API_URL) records when the
+  sendMessage call arrives, so the figure excludes network latency.
+  With BENCH_UPDATE_FILE and a real BOT_TOKEN the real API is used
+  instead and the handler's total run time is reported.
+
+    python benchmarks/bench_cold_start.py
+"""
+import os
+import sys
+import json
+import tempfile
+import threading
+import subprocess
+import time
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+
+ROOT = os.path.join(os.path.dirname(os.path.abspath(__file__)), '..')
+RUNS = 5
+
+START_UPDATE = {
+    'update_id': 1,
+    'message': {
+        'message_id': 1,
+        'date': 0,
+        'chat': {'id': 1, 'type': 'private'},
+        'from': {'id': 1, 'is_bot': False, 'first_name': 'Bench'},
+        'text': '/start',
+        'entities': [{'type': 'bot_command', 'offset': 0, 'length': 6}],
+    },
+}
+
+API_RESULTS = {
+    'getMe': {'id': 1, 'is_bot': True, 'first_name': 'Bench', 'username': 'bench_bot'},
+    'sendMessage': {'message_id': 2, 'date': 0, 'chat': {'id': 1, 'type': 'private'}, 'text': 'ok'},
+}
+
+
+class FakeBotApi(BaseHTTPRequestHandler):
+    first_reply_at = None
+
+    def do_POST(self):
+        self.rfile.read(int(self.headers.get('Content-Length') or 0))
+        method = self.path.rsplit('/', 1)[-1]
+        if method == 'sendMessage' and FakeBotApi.first_reply_at is None:
+            FakeBotApi.first_reply_at = time.perf_counter()
+        body = json.dumps({'ok': True, 'result': API_RESULTS.get(method, True)}).encode('utf-8')
+        self.send_response(200)
+        self.send_header('Content-Type', 'application/json')
+        self.send_header('Content-Length', str(len(body)))
+        self.end_headers()
+        self.wfile.write(body)
+
+    def log_message(self, format, *args):
+        pass
+
+
+def run_python(code, env=None, stdin=None):
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, '-c', code], cwd=ROOT, env=env, input=stdin,
+        capture_output=True, text=True
+    )
+    elapsed = time.perf_counter() - started
+    if result.returncode != 0:
+        return None, result.stderr.strip().splitlines()[-1]
+    return elapsed, result.stdout.strip()
+
+
+def timed_import(module, env):
+    code = (
+        "import time; t = time.perf_counter(); "
+        f"import {module}; "
+        "print((time.perf_counter() - t) * 1000)"
+    )
+    samples = []
+    for _ in range(RUNS):
+        _, out = run_python(code, env)
+        try:
+            samples.append(float(out))
+        except (TypeError, ValueError):
+            return f"failed: {out}"
+    return f"{min(samples):8.1f} ms (best of {RUNS})"
+
+
+def timed_init_db(env):
+    code = (
+        "import time; from database import Database; t = time.perf_counter(); "
+        "Database(); print((time.perf_counter() - t) * 1000)"
+    )
+    elapsed, out = run_python(code, env)
+    if elapsed is None:
+        return f"failed: {out}"
+    return f"{float(out):8.1f} ms"
+
+
+def time_to_first_reply(env):
+    """Spawn serverless.py on a /start update; return ms until sendMessage arrives."""
+    FakeBotApi.first_reply_at = None
+    started = time.perf_counter()
+    result = subprocess.run(
+        [sys.executable, 'serverless.py'], cwd=ROOT, env=env,
+        input=json.dumps(START_UPDATE), capture_output=True, text=True
+    )
+    if FakeBotApi.first_reply_at is None:
+        lines = (result.stderr or result.stdout).strip().splitlines()
+        raise RuntimeError(lines[-1] if lines else f"exit code {result.returncode}")
+    return (FakeBotApi.first_reply_at - started) * 1000
+
+
+def main():
+    env = dict(os.environ)
+    env.setdefault('BOT_TOKEN', '123456:bench')
+
+    baseline, _ = run_python("pass", env)
+    print(f"{'interpreter start-up':<28}{baseline * 1000:8.1f} ms")
+    for module in ('serverless', 'config', 'bot'):
+        print(f"{'import ' + module:<28}{timed_import(module, env)}")
+
+    with tempfile.TemporaryDirectory() as tmp:
+        env['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+        print(f"{'init_db, new database':<28}{timed_init_db(env)}")
+        print(f"{'init_db, schema matches':<28}{timed_init_db(env)}")
+
+    update_file = os.getenv('BENCH_UPDATE_FILE')
+    if update_file:
+        with open(update_file) as f:
+            update = f.read()
+        elapsed, out = run_python(
+            "import runpy; runpy.run_module('serverless', run_name='__main__')", os.environ, update
+        )
+        if elapsed is None:
+            print(f"time to first reply: failed: {out}")
+        else:
+            print(f"{'time to first reply':<28}{elapsed * 1000:8.1f} ms (process start to handler return)")
+        return
+
+    server = ThreadingHTTPServer(('127.0.0.1', 0), FakeBotApi)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    with tempfile.TemporaryDirectory() as tmp:
+        env['BOT_TOKEN'] = '123456:bench'
+        env['BOT_API_URL'] = f"http://127.0.0.1:{server.server_address[1]}/bot"
+        env['DATABASE_NAME'] = os.path.join(tmp, 'bench.db')
+        env['STORAGE_DIR'] = tmp
+        try:
+            print(f"{'first reply, new database':<28}{time_to_first_reply(env):8.1f} ms")
+            samples = [time_to_first_reply(env) for _ in range(RUNS)]
+            print(f"{'first reply, schema matches':<28}{min(samples):8.1f} ms (best of {RUNS})")
+        except RuntimeError as e:
+            print(f"time to first reply: failed: {e}")
+    server.shutdown()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,76 @@
+"""Measure how long a log call blocks the caller.
+
+Compares the old synchronous basicConfig setup against the queue-backed
+pipeline from log_setup, writing to a sink that simulates a slow disk or
+a back-pressured container stdout.
+
+    python benchmarks/bench_logging.py
+"""
+import os
+import sys
+import time
+import logging
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..'))
+
+import log_setup
+
+ITERATIONS = 2000
+WRITE_DELAY = 0.0005  # seconds per write on the slow sink
+
+
+class SlowHandler(logging.Handler):
+    def emit(self, record):
+        self.format(record)
+        time.sleep(WRITE_DELAY)
+
+
+def reset_root():
+    log_setup.stop_logging()
+    root = logging.getLogger()
+    for handler in root.handlers[:]:
+        root.removeHandler(handler)
+
+
+def run(label, logger, eager, sample=False):
+    payload = {'status': 200, 'size': 123456}
+    extra = {'sample': True} if sample else None
+    started = time.perf_counter()
+    for i in range(ITERATIONS):
+        if eager:
+            logger.info(f"API Response Status: {payload} #{i}", extra=extra)
+        else:
+            logger.info("API Response Status: %s #%d", payload, i, extra=extra)
+    elapsed = time.perf_counter() - started
+    print(f"{label:<40} {elapsed / ITERATIONS * 1e6:9.1f} us/call")
+
+
+def main():
+    logger = logging.getLogger('bench')
+
+    reset_root()
+    handler = SlowHandler()
+    handler.setFormatter(logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s'))
+    logging.getLogger().addHandler(handler)
+    logging.getLogger().setLevel(logging.INFO)
+    run("sync handler, eager f-string", logger, eager=True)
+    run("sync handler, lazy args", logger, eager=False)
+
+    for rate in (1.0, 0.1):
+        reset_root()
+        log_setup.setup_logging(logging.INFO, rate, handler=SlowHandler())
+        run(f"queued, eager f-string, sample={rate}", logger, eager=True, sample=True)
+        run(f"queued, lazy args, sample={rate}", logger, eager=False, sample=True)
+
+    # Level-filtered calls never build the message when arguments are lazy
+    logging.getLogger().setLevel(logging.WARNING)
+    run("queued, lazy args, level filtered", logger, eager=False)
+    run("queued, eager f-string, level filtered", logger, eager=True)
+
+    started = time.perf_counter()
+    reset_root()
+    print(f"{'drain time on shutdown':<40} {(time.perf_counter() - started) * 1000:9.1f} ms")
+
+
+if __name__ == '__main__':
+    main()
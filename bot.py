@@ -1,39 +1,85 @@
 import os
+import time
+import asyncio
 import logging
-from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup
+from telegram import Update, InlineKeyboardButton, InlineKeyboardMarkup, InputMediaPhoto
 from telegram.ext import (
     Application, CommandHandler, MessageHandler, CallbackQueryHandler,
     ContextTypes, filters
 )
-from config import Config
+from config import Config, on_reload, install_reload_handler
 from database import Database
-from file_manager import FileManager
+from file_manager import FileManager, CONTENT_MISMATCH
+from thumbnails import ThumbnailManager, MAX_MEDIA_GROUP_SIZE
+from log_setup import setup_logging, set_log_level, install_request_context, log_stage
 
 # Set up logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+setup_logging(Config.LOG_LEVEL, Config.LOG_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 class TelegramFileBot:
-    def __init__(self):
+    def __init__(self, serverless=False):
         # Validate configuration first
         if not Config.BOT_TOKEN:
             raise ValueError("BOT_TOKEN environment variable is not set!")
         
         self.db = Database()
         self.file_manager = FileManager()
+        self.thumbnails = ThumbnailManager(
+            os.path.join(Config.STORAGE_DIR, 'thumbnails'),
+            max_cache_bytes=Config.THUMBNAIL_CACHE_MAX_BYTES,
+            size=Config.THUMBNAIL_SIZE,
+            workers=Config.THUMBNAIL_WORKERS
+        )
+        self.maintenance = None
         
         # Create application
-        self.application = Application.builder().token(Config.BOT_TOKEN).build()
+        builder = (
+            Application.builder()
+            .token(Config.BOT_TOKEN)
+            .connection_pool_size(Config.CONNECTION_POOL_SIZE)
+            .connect_timeout(Config.CONNECT_TIMEOUT)
+            .read_timeout(Config.READ_TIMEOUT)
+            .write_timeout(Config.WRITE_TIMEOUT)
+            .pool_timeout(Config.POOL_TIMEOUT)
+            .concurrent_updates(Config.CONCURRENT_UPDATES)
+            .post_shutdown(self.post_shutdown)
+        )
+        if Config.BOT_API_URL:
+            builder = builder.base_url(Config.BOT_API_URL)
+        if Config.BOT_API_FILE_URL:
+            builder = builder.base_file_url(Config.BOT_API_FILE_URL)
+        if Config.BOT_API_LOCAL_MODE:
+            builder = builder.local_mode(True)
+        if serverless:
+            # One update per invocation: no polling updater and no background jobs
+            builder = builder.updater(None).job_queue(None)
+        else:
+            builder = builder.post_init(self.post_init)
+        self.application = builder.build()
+        install_request_context(self.application)
         self.setup_handlers()
+        if not serverless:
+            # Only long-running processes need the maintenance job
+            from maintenance import MaintenanceJob
+            
+            self.maintenance = MaintenanceJob(
+                self.db,
+                self.thumbnails,
+                retention_days=Config.RETENTION_DAYS,
+                user_retention_days=Config.USER_RETENTION_DAYS,
+                pending_upload_ttl=Config.PENDING_UPLOAD_TTL,
+                batch_size=Config.MAINTENANCE_BATCH_SIZE
+            )
+            self.maintenance.schedule(self.application.job_queue, interval=Config.MAINTENANCE_INTERVAL)
+            on_reload(self.apply_config)
     
     def setup_handlers(self):
         # Command handlers
         self.application.add_handler(CommandHandler("start", self.start))
         self.application.add_handler(CommandHandler("help", self.help))
         self.application.add_handler(CommandHandler("myfiles", self.my_files))
+        self.application.add_handler(CommandHandler("gallery", self.gallery))
         self.application.add_handler(CommandHandler("stats", self.stats))
         
         # Message handlers
@@ -72,12 +118,13 @@ Commands:
 /start - Start the bot
 /help - Show help message
 /myfiles - List your stored files
+/gallery - Browse previews of your images and videos
 /stats - Show your storage statistics
             """
             
             await update.message.reply_text(welcome_text)
         except Exception as e:
-            logger.error(f"Error in start command: {e}")
+            logger.error("Error in start command: %s", e)
             await update.message.reply_text("❌ An error occurred. Please try again.")
     
     async def help(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -96,20 +143,21 @@ Use /myfiles to see all your stored files and manage them.
 - Images: JPG, PNG, GIF, BMP
 - Documents: PDF, DOC, DOCX, TXT
 - Archives: ZIP, RAR, 7Z
-- Audio: MP3, WAV, OGG
-- Video: MP4, AVI, MKV
+- Audio: MP3, WAV, OGG, M4A
+- Video: MP4, AVI, MKV, MOV
 
 **Commands:**
 /start - Start the bot
 /help - Show this help message
 /myfiles - List your stored files
+/gallery - Browse previews of your images and videos
 /stats - Show storage statistics
 
 **Note:** Maximum file size is 50MB.
             """
             await update.message.reply_text(help_text)
         except Exception as e:
-            logger.error(f"Error in help command: {e}")
+            logger.error("Error in help command: %s", e)
             await update.message.reply_text("❌ An error occurred. Please try again.")
     
     async def handle_file(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -129,10 +177,12 @@ Use /myfiles to see all your stored files and manage them.
                 file_name = f"photo_{file.file_id}.jpg"
             elif update.message.video:
                 file = update.message.video
-                file_name = f"video_{file.file_id}.mp4"
+                file_name = file.file_name or \
+                    f"video_{file.file_id}{self.file_manager.extension_for_mime(file.mime_type, '.mp4')}"
             elif update.message.audio:
                 file = update.message.audio
-                file_name = f"audio_{file.file_id}.mp3"
+                file_name = file.file_name or \
+                    f"audio_{file.file_id}{self.file_manager.extension_for_mime(file.mime_type, '.mp3')}"
             else:
                 await update.message.reply_text("❌ Unsupported file type.")
                 return
@@ -145,9 +195,22 @@ Use /myfiles to see all your stored files and manage them.
                 return
             
             # Check if file type is allowed
-            is_allowed, file_category = self.file_manager.is_file_allowed(file_name)
+            if update.message.photo:
+                # Telegram always re-encodes photos as JPEG
+                is_allowed, file_category = self.file_manager.is_file_allowed(file_name)
+                file_type = 'image/jpeg'
+            else:
+                with log_stage('classify'):
+                    is_allowed, file_category, file_type = await self.file_manager.classify(
+                        context.bot, file, file_name
+                    )
             if not is_allowed:
-                await update.message.reply_text("❌ This file type is not supported.")
+                if file_category == CONTENT_MISMATCH:
+                    await update.message.reply_text(
+                        "❌ This file's content doesn't match its extension. Please check the file and try again."
+                    )
+                else:
+                    await update.message.reply_text("❌ This file type is not supported.")
                 return
             
             # Store description context for next message
@@ -155,8 +218,10 @@ Use /myfiles to see all your stored files and manage them.
             context.user_data['pending_file'] = {
                 'file_id': file.file_id,
                 'file_name': file_name,
-                'file_type': file.mime_type if hasattr(file, 'mime_type') else file_category,
-                'file_size': file.file_size
+                'file_type': file_type,
+                'file_size': file.file_size,
+                'thumb_source': self.thumbnails.select_source(update.message),
+                'created_at': time.time()
             }
             
             keyboard = [[InlineKeyboardButton("Skip Description", callback_data="skip_description")]]
@@ -168,7 +233,7 @@ Use /myfiles to see all your stored files and manage them.
                 reply_markup=reply_markup
             )
         except Exception as e:
-            logger.error(f"Error handling file: {e}")
+            logger.error("Error handling file: %s", e)
             await update.message.reply_text("❌ An error occurred while processing your file.")
     
     async def handle_text(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -181,16 +246,20 @@ Use /myfiles to see all your stored files and manage them.
                 pending_file = user_data['pending_file']
                 
                 # Add file to database
-                file_db_id = self.db.add_file(
-                    update.effective_user.id,
-                    pending_file['file_id'],
-                    pending_file['file_name'],
-                    pending_file['file_type'],
-                    pending_file['file_size'],
-                    description
-                )
+                with log_stage('db_write'):
+                    file_db_id = self.db.add_file(
+                        update.effective_user.id,
+                        pending_file['file_id'],
+                        pending_file['file_name'],
+                        pending_file['file_type'],
+                        pending_file['file_size'],
+                        description,
+                        thumb_file_id=pending_file.get('thumb_source')
+                    )
                 
                 if file_db_id:
+                    self.schedule_thumbnail(context, file_db_id, pending_file)
+                    
                     # Clear context
                     user_data['waiting_for_description'] = False
                     user_data['pending_file'] = None
@@ -202,7 +271,7 @@ Use /myfiles to see all your stored files and manage them.
                 else:
                     await update.message.reply_text("❌ Failed to store file. Please try again.")
         except Exception as e:
-            logger.error(f"Error handling text: {e}")
+            logger.error("Error handling text: %s", e)
             await update.message.reply_text("❌ An error occurred. Please try again.")
     
     async def button_handler(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
@@ -216,17 +285,24 @@ Use /myfiles to see all your stored files and manage them.
             
             if data == "skip_description":
                 user_data = context.user_data
-                pending_file = user_data['pending_file']
+                pending_file = user_data.get('pending_file')
                 
-                file_db_id = self.db.add_file(
-                    user_id,
-                    pending_file['file_id'],
-                    pending_file['file_name'],
-                    pending_file['file_type'],
-                    pending_file['file_size']
-                )
+                if not pending_file:
+                    await query.edit_message_text("⌛ This upload has expired. Please send the file again.")
+                    return
+                
+                with log_stage('db_write'):
+                    file_db_id = self.db.add_file(
+                        user_id,
+                        pending_file['file_id'],
+                        pending_file['file_name'],
+                        pending_file['file_type'],
+                        pending_file['file_size'],
+                        thumb_file_id=pending_file.get('thumb_source')
+                    )
                 
                 if file_db_id:
+                    self.schedule_thumbnail(context, file_db_id, pending_file)
                     user_data['waiting_for_description'] = False
                     user_data['pending_file'] = None
                     await query.edit_message_text(f"✅ File stored successfully! (ID: {file_db_id})")
@@ -237,9 +313,14 @@ Use /myfiles to see all your stored files and manage them.
                 page = int(data.split("_")[2])
                 await self.show_user_files(query, user_id, page)
             
+            elif data.startswith("gallery_"):
+                page = int(data.split("_")[1])
+                await self.show_gallery(query.message, context, user_id, page)
+            
             elif data.startswith("delete_"):
                 file_id = int(data.split("_")[1])
                 if self.db.delete_file(file_id, user_id):
+                    self.thumbnails.discard(file_id)
                     await query.edit_message_text("✅ File deleted successfully!")
                 else:
                     await query.edit_message_text("❌ Failed to delete file.")
@@ -258,7 +339,7 @@ Use /myfiles to see all your stored files and manage them.
                 else:
                     await query.edit_message_text("❌ File not found.")
         except Exception as e:
-            logger.error(f"Error in button handler: {e}")
+            logger.error("Error in button handler: %s", e)
             try:
                 await query.edit_message_text("❌ An error occurred. Please try again.")
             except:
@@ -270,7 +351,7 @@ Use /myfiles to see all your stored files and manage them.
             user_id = update.effective_user.id
             await self.show_user_files(update.message, user_id, page=1)
         except Exception as e:
-            logger.error(f"Error in my_files command: {e}")
+            logger.error("Error in my_files command: %s", e)
             await update.message.reply_text("❌ An error occurred. Please try again.")
     
     async def show_user_files(self, message, user_id, page=1):
@@ -336,6 +417,8 @@ Use /myfiles to see all your stored files and manage them.
             if nav_buttons:
                 keyboard.append(nav_buttons)
             
+            keyboard.append([InlineKeyboardButton("🖼️ Gallery", callback_data="gallery_1")])
+            
             reply_markup = InlineKeyboardMarkup(keyboard)
             
             if hasattr(message, 'reply_text'):
@@ -343,12 +426,132 @@ Use /myfiles to see all your stored files and manage them.
             else:
                 await message.edit_message_text(text, reply_markup=reply_markup)
         except Exception as e:
-            logger.error(f"Error showing user files: {e}")
+            logger.error("Error showing user files: %s", e)
             if hasattr(message, 'reply_text'):
                 await message.reply_text("❌ An error occurred while loading your files.")
             else:
                 await message.edit_message_text("❌ An error occurred while loading your files.")
     
+    async def gallery(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
+        """Show previews of the user's images and videos."""
+        try:
+            user_id = update.effective_user.id
+            await self.show_gallery(update.message, context, user_id, page=1)
+        except Exception as e:
+            logger.error("Error in gallery command: %s", e)
+            await update.message.reply_text("❌ An error occurred. Please try again.")
+    
+    async def show_gallery(self, message, context, user_id, page=1):
+        """Send one page of thumbnails as a media group."""
+        try:
+            files = self.db.get_user_media_files(user_id, self.thumbnails.max_source_size)
+            
+            if not files:
+                await message.reply_text("🖼️ No previews available yet. Send me some images or videos!")
+                return
+            
+            items_per_page = MAX_MEDIA_GROUP_SIZE
+            total_pages = (len(files) + items_per_page - 1) // items_per_page
+            page = max(1, min(page, total_pages))
+            start_idx = (page - 1) * items_per_page
+            current_files = files[start_idx:start_idx + items_per_page]
+            
+            media = []
+            unavailable = []
+            for file_db_id, file_name, source_file_id in current_files:
+                path = self.thumbnails.get_cached(file_db_id)
+                if not path:
+                    # Rebuild evicted or never generated thumbnails in the
+                    # background; rendering here would hold up every other update
+                    self.thumbnails.schedule(context.bot, file_db_id, source_file_id)
+                    unavailable.append(f"🆔 {file_db_id} 📄 {file_name}")
+                    continue
+                with open(path, 'rb') as f:
+                    media.append(InputMediaPhoto(media=f.read(), caption=f"🆔 {file_db_id} 📄 {file_name}"))
+            
+            if len(media) == 1:
+                await context.bot.send_photo(
+                    chat_id=message.chat_id, photo=media[0].media, caption=media[0].caption
+                )
+            elif media:
+                await context.bot.send_media_group(chat_id=message.chat_id, media=media)
+            
+            # Media groups can't carry inline keyboards, so follow up with one
+            keyboard = []
+            row_buttons = []
+            for file_db_id, _, _ in current_files:
+                row_buttons.append(InlineKeyboardButton(
+                    f"📥 {file_db_id}",
+                    callback_data=f"download_{file_db_id}"
+                ))
+                if len(row_buttons) >= 5:
+                    keyboard.append(row_buttons)
+                    row_buttons = []
+            if row_buttons:
+                keyboard.append(row_buttons)
+            
+            nav_buttons = []
+            if page > 1:
+                nav_buttons.append(InlineKeyboardButton(
+                    "⬅️ Previous",
+                    callback_data=f"gallery_{page-1}"
+                ))
+            if page < total_pages:
+                nav_buttons.append(InlineKeyboardButton(
+                    "Next ➡️",
+                    callback_data=f"gallery_{page+1}"
+                ))
+            if nav_buttons:
+                keyboard.append(nav_buttons)
+            
+            text = f"🖼️ Gallery (Page {page}/{total_pages})"
+            if unavailable:
+                text += "\n\n⏳ Preview not ready:\n" + "\n".join(unavailable)
+            
+            await message.reply_text(text, reply_markup=InlineKeyboardMarkup(keyboard))
+        except Exception as e:
+            logger.error("Error showing gallery: %s", e)
+            await message.reply_text("❌ An error occurred while loading your gallery.")
+    
+    def schedule_thumbnail(self, context, file_db_id, pending_file):
+        """Queue background thumbnail generation for a newly stored file."""
+        try:
+            self.thumbnails.schedule(
+                context.bot,
+                file_db_id,
+                pending_file.get('thumb_source')
+            )
+        except Exception as e:
+            logger.error("Error scheduling thumbnail: %s", e)
+    
+    async def post_init(self, application):
+        """Reload tuning settings on SIGHUP once the event loop is running."""
+        install_reload_handler(asyncio.get_running_loop())
+    
+    def apply_config(self, changed):
+        """Push reloaded settings into the running components."""
+        set_log_level(Config.LOG_LEVEL, Config.LOG_SAMPLE_RATE)
+        
+        self.thumbnails.max_cache_bytes = Config.THUMBNAIL_CACHE_MAX_BYTES
+        self.thumbnails.size = Config.THUMBNAIL_SIZE
+        self.thumbnails.set_workers(Config.THUMBNAIL_WORKERS)
+        
+        self.maintenance.retention_days = Config.RETENTION_DAYS
+        self.maintenance.user_retention_days = Config.USER_RETENTION_DAYS
+        self.maintenance.pending_upload_ttl = Config.PENDING_UPLOAD_TTL
+        self.maintenance.batch_size = Config.MAINTENANCE_BATCH_SIZE
+        if 'MAINTENANCE_INTERVAL' in changed:
+            self.maintenance.schedule(
+                self.application.job_queue,
+                interval=Config.MAINTENANCE_INTERVAL,
+                first=Config.MAINTENANCE_INTERVAL
+            )
+    
+    async def post_shutdown(self, application):
+        """Release background workers when the application stops."""
+        self.thumbnails.shutdown()
+        await self.file_manager.close()
+    
     async def stats(self, update: Update, context: ContextTypes.DEFAULT_TYPE):
         """Show user storage statistics."""
         try:
@@ -374,7 +577,7 @@ Use /myfiles to see all your stored files and manage them.
             
             await update.message.reply_text(stats_text)
         except Exception as e:
-            logger.error(f"Error in stats command: {e}")
+            logger.error("Error in stats command: %s", e)
             await update.message.reply_text("❌ An error occurred. Please try again.")
     
     def run(self):
@@ -394,5 +597,5 @@ Use /myfiles to see all your stored files and manage them.
                 timeout=30
             )
         except Exception as e:
-            logger.error(f"❌ Error starting bot: {e}")
+            logger.error("❌ Error starting bot: %s", e)
             raise
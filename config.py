@@ -1,28 +1,295 @@
 import os
-from dotenv import load_dotenv
+import logging
+from dataclasses import dataclass, field, fields
+from typing import Dict, Optional, Tuple
 
-load_dotenv()
+logger = logging.getLogger(__name__)
 
-# Bot configuration
-BOT_TOKEN = os.getenv('BOT_TOKEN')
-REMOVE_BG_API_KEY = os.getenv('REMOVE_BG_API_KEY')
+# Optional .env-style file re-read on every reload
+CONFIG_FILE = os.getenv('CONFIG_FILE')
+
+
+def _find_dotenv():
+    if CONFIG_FILE:
+        return CONFIG_FILE
+    from dotenv import find_dotenv
+    return find_dotenv()
+
+
+def _load_dotenv():
+    from dotenv import load_dotenv
+    load_dotenv(_dotenv_path)
+
+
+def _reload_environ():
+    """Return the startup environment with the current file contents on top.
+
+    os.environ itself is left alone, so a rejected value never sticks and a
+    key removed from the file falls back to its startup value or default.
+    """
+    environ = dict(_base_environ)
+    if _dotenv_path:
+        from dotenv import dotenv_values
+        environ.update({k: v for k, v in dotenv_values(_dotenv_path).items() if v is not None})
+    return environ
+
+
+# Deployments that pass every setting through the environment can set
+# SKIP_DOTENV=1 to avoid python-dotenv's import and .env search at startup
+_use_dotenv = bool(CONFIG_FILE) or os.getenv('SKIP_DOTENV', '').strip().lower() not in ('1', 'true', 'yes', 'on')
+# The file SIGHUP reloads re-read; empty when there is none
+_dotenv_path = _find_dotenv() if _use_dotenv else ''
+# The environment as the process received it, before any file was applied
+_base_environ = dict(os.environ)
+if _dotenv_path:
+    _load_dotenv()
+
+
+DEFAULT_ALLOWED_EXTENSIONS = {
+    'images': ('.jpg', '.jpeg', '.png', '.gif', '.bmp'),
+    'documents': ('.pdf', '.doc', '.docx', '.txt'),
+    'archives': ('.zip', '.rar', '.7z'),
+    'audio': ('.mp3', '.wav', '.ogg', '.m4a'),
+    'video': ('.mp4', '.avi', '.mkv', '.mov'),
+}
+
+# Fields that are baked into long-lived objects at startup; changing them
+# on reload only takes effect after a restart
+RESTART_REQUIRED = {
+    'BOT_TOKEN', 'BOT_API_URL', 'BOT_API_FILE_URL', 'BOT_API_LOCAL_MODE',
+    'DATABASE_NAME', 'STORAGE_DIR', 'CONNECTION_POOL_SIZE', 'CONNECT_TIMEOUT', 'READ_TIMEOUT', 'WRITE_TIMEOUT',
+    'POOL_TIMEOUT', 'CONCURRENT_UPDATES',
+}
+
+
+def _parse_extensions(raw):
+    """Parse 'images=.jpg,.png;audio=.mp3' into a category -> extensions map."""
+    result = {}
+    for group in raw.split(';'):
+        if not group.strip():
+            continue
+        category, _, extensions = group.partition('=')
+        result[category.strip()] = tuple(
+            ext.strip().lower() if ext.strip().startswith('.') else f".{ext.strip().lower()}"
+            for ext in extensions.split(',') if ext.strip()
+        )
+    return result
+
+
+def _parse_user_retention(raw):
+    """Parse '12345:30,67890:0' into user_id -> days; 0 keeps that user's files forever."""
+    result = {}
+    for item in raw.split(','):
+        if not item.strip():
+            continue
+        user_id, _, days = item.partition(':')
+        days = int(days)
+        result[int(user_id)] = days or None
+    return result
+
+
+def _parse_bool(raw):
+    value = raw.strip().lower()
+    if value in ('1', 'true', 'yes', 'on'):
+        return True
+    if value in ('0', 'false', 'no', 'off', ''):
+        return False
+    raise ValueError("expected true/false, yes/no, on/off or 1/0")
+
+
+def _parse_optional_int(raw):
+    return int(raw) if raw.strip() else None
+
+
+_PARSERS = {
+    str: str,
+    int: int,
+    float: float,
+    bool: _parse_bool,
+    Optional[str]: str,
+    Optional[int]: _parse_optional_int,
+    Dict[str, Tuple[str, ...]]: _parse_extensions,
+    Dict[int, Optional[int]]: _parse_user_retention,
+}
+
+
+@dataclass
+class Settings:
+    # Bot credentials
+    BOT_TOKEN: Optional[str] = None
+    # Bot API endpoint, e.g. a local Bot API server; None uses api.telegram.org
+    BOT_API_URL: Optional[str] = None
+    # File download endpoint matching BOT_API_URL, e.g. http://localhost:8081/file/bot
+    BOT_API_FILE_URL: Optional[str] = None
+    # Set when BOT_API_URL is a Bot API server started with --local: files are
+    # read from its disk and the 20 MB download limit doesn't apply
+    BOT_API_LOCAL_MODE: bool = False
+    REMOVE_BG_API_KEY: Optional[str] = None
+    REMOVE_BG_URL: str = "https://api.remove.bg/v1.0/removebg"
+    REMOVE_BG_TIMEOUT: float = 60.0
+
+    # Storage
+    DATABASE_NAME: str = 'file_bot.db'
+    DB_TIMEOUT: float = 5.0
+    STORAGE_DIR: str = 'storage'
+    MAX_FILE_SIZE: int = 50 * 1024 * 1024
+    ALLOWED_EXTENSIONS: Dict[str, Tuple[str, ...]] = field(
+        default_factory=lambda: dict(DEFAULT_ALLOWED_EXTENSIONS)
+    )
+    # Check uploads' leading bytes instead of trusting names and client MIME types
+    CONTENT_SNIFFING: bool = False
+    SNIFF_BYTES: int = 4096
+
+    # Telegram HTTP client and update processing
+    CONNECTION_POOL_SIZE: int = 8
+    CONNECT_TIMEOUT: float = 5.0
+    READ_TIMEOUT: float = 10.0
+    WRITE_TIMEOUT: float = 30.0
+    POOL_TIMEOUT: float = 5.0
+    CONCURRENT_UPDATES: int = 1
+
+    # Thumbnails
+    THUMBNAIL_WORKERS: int = 2
+    THUMBNAIL_SIZE: int = 320
+    THUMBNAIL_CACHE_MAX_BYTES: int = 64 * 1024 * 1024
+
+    # Maintenance
+    MAINTENANCE_INTERVAL: int = 3600
+    RETENTION_DAYS: Optional[int] = None
+    USER_RETENTION_DAYS: Dict[int, Optional[int]] = field(default_factory=dict)
+    PENDING_UPLOAD_TTL: int = 3600
+    MAINTENANCE_BATCH_SIZE: int = 200
+
+    # Logging
+    LOG_LEVEL: str = 'INFO'
+    # Fraction of high-volume INFO lines (per-update summaries, HTTP requests) to keep
+    LOG_SAMPLE_RATE: float = 1.0
+
+    @classmethod
+    def from_env(cls, environ=None):
+        """Build settings from environment variables named after each field."""
+        if environ is None:
+            environ = os.environ
+        values = {}
+        for f in fields(cls):
+            raw = environ.get(f.name)
+            if raw is None:
+                continue
+            try:
+                values[f.name] = _PARSERS[f.type](raw)
+            except (TypeError, ValueError) as e:
+                raise ValueError(f"Invalid value for {f.name}: {raw!r} ({e})")
+        if 'LOG_LEVEL' in values:
+            values['LOG_LEVEL'] = values['LOG_LEVEL'].upper()
+        return cls(**values)
+
+    def validate(self):
+        """Raise ValueError listing every setting that is out of range."""
+        errors = []
+
+        positive = [
+            'MAX_FILE_SIZE', 'DB_TIMEOUT', 'REMOVE_BG_TIMEOUT', 'CONNECTION_POOL_SIZE',
+            'CONNECT_TIMEOUT', 'READ_TIMEOUT', 'WRITE_TIMEOUT', 'POOL_TIMEOUT',
+            'CONCURRENT_UPDATES', 'THUMBNAIL_WORKERS', 'THUMBNAIL_SIZE',
+            'THUMBNAIL_CACHE_MAX_BYTES', 'MAINTENANCE_INTERVAL', 'PENDING_UPLOAD_TTL',
+            'MAINTENANCE_BATCH_SIZE', 'SNIFF_BYTES',
+        ]
+        for name in positive:
+            if getattr(self, name) <= 0:
+                errors.append(f"{name} must be positive")
+
+        if self.RETENTION_DAYS is not None and self.RETENTION_DAYS <= 0:
+            errors.append("RETENTION_DAYS must be positive")
+        if any(days is not None and days <= 0 for days in self.USER_RETENTION_DAYS.values()):
+            errors.append("USER_RETENTION_DAYS values must be positive")
+        if not 0 < self.LOG_SAMPLE_RATE <= 1:
+            errors.append("LOG_SAMPLE_RATE must be in (0, 1]")
+        if not isinstance(logging.getLevelName(self.LOG_LEVEL), int):
+            errors.append(f"LOG_LEVEL {self.LOG_LEVEL!r} is not a logging level")
+        if not self.ALLOWED_EXTENSIONS:
+            errors.append("ALLOWED_EXTENSIONS must not be empty")
+        empty = sorted(category for category, extensions in self.ALLOWED_EXTENSIONS.items() if not extensions)
+        if empty:
+            errors.append(f"ALLOWED_EXTENSIONS categories have no extensions: {', '.join(empty)}")
+
+        if errors:
+            raise ValueError(f"Invalid configuration: {'; '.join(errors)}")
+        return self
+
+
+Config = Settings.from_env().validate()
+
+_reload_callbacks = []
+
+
+def on_reload(callback):
+    """Register callback(changed_field_names) to run after a successful reload."""
+    _reload_callbacks.append(callback)
+
+
+def reload_config():
+    """Re-read settings and apply them to Config in place.
+
+    Values come from the startup environment overlaid with the current
+    contents of CONFIG_FILE (or the .env found at startup unless SKIP_DOTENV
+    is set). Invalid settings are rejected as a whole and the running values
+    kept. Returns the set of fields that changed.
+    """
+    try:
+        new = Settings.from_env(_reload_environ()).validate()
+    except Exception as e:
+        logger.error("Config reload rejected: %s", e)
+        return set()
+
+    changed = {f.name for f in fields(Settings) if getattr(Config, f.name) != getattr(new, f.name)}
+    restart_only = changed & RESTART_REQUIRED
+    if restart_only:
+        logger.warning("Restart required for: %s", ', '.join(sorted(restart_only)))
+    changed -= restart_only
+
+    if not changed:
+        return changed
+
+    for name in changed:
+        setattr(Config, name, getattr(new, name))
+    logger.info("🔄 Config reloaded: %s", ', '.join(sorted(changed)))
+
+    for callback in _reload_callbacks:
+        try:
+            callback(changed)
+        except Exception as e:
+            logger.error("Error applying reloaded config: %s", e)
+    return changed
+
+
+def install_reload_handler(loop):
+    """Reload Config when the process receives SIGHUP."""
+    import signal
+
+    if not hasattr(signal, 'SIGHUP'):
+        return
+    if not _dotenv_path:
+        # A running process can't see changes to its own environment
+        logger.warning(
+            "No CONFIG_FILE or .env to re-read; SIGHUP reload won't pick up new settings. "
+            "Set CONFIG_FILE to tune a running bot."
+        )
+    loop.add_signal_handler(signal.SIGHUP, reload_config)
 
-# Remove.bg API endpoint - CORRECTED
-REMOVE_BG_URL = "https://api.remove.bg/v1.0/removebg"
 
 # Validate configuration
 def validate_config():
     missing_vars = []
-    
-    if not BOT_TOKEN:
+
+    if not Config.BOT_TOKEN:
         missing_vars.append('BOT_TOKEN')
-    
-    if not REMOVE_BG_API_KEY:
+
+    if not Config.REMOVE_BG_API_KEY:
         missing_vars.append('REMOVE_BG_API_KEY')
-    
+
     if missing_vars:
         raise ValueError(f"Missing environment variables: {', '.join(missing_vars)}")
-    
+
     print("✅ Configuration validated successfully!")
 
 if __name__ == '__main__':
@@ -1,23 +1,43 @@
 import sqlite3
 import os
+import time
 import logging
 from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Bump whenever init_db's DDL changes so existing databases pick it up
+SCHEMA_VERSION = 2
+
 class Database:
     def __init__(self):
         self.db_name = Config.DATABASE_NAME
         self.init_db()
     
     def get_connection(self):
-        return sqlite3.connect(self.db_name, check_same_thread=False)
+        return sqlite3.connect(self.db_name, timeout=Config.DB_TIMEOUT, check_same_thread=False)
     
     def init_db(self):
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
+            # PRAGMA user_version is a single header read, so a database that is
+            # already on the current schema skips all DDL
+            cursor.execute("PRAGMA user_version")
+            if cursor.fetchone()[0] == SCHEMA_VERSION:
+                conn.close()
+                logger.info("✅ Database schema is up to date")
+                return
+            
+            # Incremental auto-vacuum lets maintenance hand free pages back to
+            # the OS in small steps. Existing databases need one full VACUUM
+            # for the mode change to take effect.
+            cursor.execute("PRAGMA auto_vacuum")
+            if cursor.fetchone()[0] != 2:
+                cursor.execute("PRAGMA auto_vacuum = INCREMENTAL")
+                cursor.execute("VACUUM")
+            
             # Create files table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS files (
@@ -32,6 +52,20 @@ class Database:
                 )
             ''')
             
+            # Telegram file used to (re)generate the gallery thumbnail
+            cursor.execute("PRAGMA table_info(files)")
+            if 'thumb_file_id' not in [row[1] for row in cursor.fetchall()]:
+                cursor.execute("ALTER TABLE files ADD COLUMN thumb_file_id TEXT")
+            
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_files_upload_date
+                ON files (upload_date)
+            ''')
+            cursor.execute('''
+                CREATE INDEX IF NOT EXISTS idx_files_user_upload_date
+                ON files (user_id, upload_date)
+            ''')
+            
             # Create users table
             cursor.execute('''
                 CREATE TABLE IF NOT EXISTS users (
@@ -43,11 +77,12 @@ class Database:
                 )
             ''')
             
+            cursor.execute(f"PRAGMA user_version = {SCHEMA_VERSION}")
             conn.commit()
             conn.close()
             logger.info("✅ Database initialized successfully")
         except Exception as e:
-            logger.error(f"❌ Database initialization failed: {e}")
+            logger.error("❌ Database initialization failed: %s", e)
             raise
     
     def add_user(self, user_id, username, first_name, last_name):
@@ -64,25 +99,27 @@ class Database:
             conn.close()
             return True
         except Exception as e:
-            logger.error(f"Error adding user: {e}")
+            logger.error("Error adding user: %s", e)
             return False
     
-    def add_file(self, user_id, file_id, file_name, file_type, file_size, description=None):
+    def add_file(self, user_id, file_id, file_name, file_type, file_size, description=None,
+                 thumb_file_id=None):
         try:
             conn = self.get_connection()
             cursor = conn.cursor()
             
             cursor.execute('''
-                INSERT INTO files (user_id, file_id, file_name, file_type, file_size, description)
-                VALUES (?, ?, ?, ?, ?, ?)
-            ''', (user_id, file_id, file_name, file_type, file_size, description))
+                INSERT INTO files (user_id, file_id, file_name, file_type, file_size, description,
+                                   thumb_file_id)
+                VALUES (?, ?, ?, ?, ?, ?, ?)
+            ''', (user_id, file_id, file_name, file_type, file_size, description, thumb_file_id))
             
             file_db_id = cursor.lastrowid
             conn.commit()
             conn.close()
             return file_db_id
         except Exception as e:
-            logger.error(f"Error adding file: {e}")
+            logger.error("Error adding file: %s", e)
             return None
     
     def get_user_files(self, user_id):
@@ -99,7 +136,33 @@ class Database:
             conn.close()
             return files
         except Exception as e:
-            logger.error(f"Error getting user files: {e}")
+            logger.error("Error getting user files: %s", e)
+            return []
+    
+    def get_user_media_files(self, user_id, max_source_size):
+        """Return (id, file_name, thumbnail source file_id) for files that can have a preview.
+
+        Rows stored before thumb_file_id existed fall back to the file itself
+        when it is a reasonably small image.
+        """
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            cursor.execute('''
+                SELECT id, file_name, COALESCE(thumb_file_id, file_id) FROM files
+                WHERE user_id = ? AND (
+                    thumb_file_id IS NOT NULL
+                    OR ((file_type LIKE 'image/%' OR file_type = 'images') AND file_size <= ?)
+                )
+                ORDER BY upload_date DESC
+            ''', (user_id, max_source_size))
+            
+            files = cursor.fetchall()
+            conn.close()
+            return files
+        except Exception as e:
+            logger.error("Error getting user media files: %s", e)
             return []
     
     def get_file(self, file_db_id, user_id):
@@ -116,7 +179,7 @@ class Database:
             conn.close()
             return file_data
         except Exception as e:
-            logger.error(f"Error getting file: {e}")
+            logger.error("Error getting file: %s", e)
             return None
     
     def delete_file(self, file_db_id, user_id):
@@ -132,7 +195,7 @@ class Database:
             conn.close()
             return True
         except Exception as e:
-            logger.error(f"Error deleting file: {e}")
+            logger.error("Error deleting file: %s", e)
             return False
     
     def get_file_stats(self, user_id):
@@ -148,5 +211,79 @@ class Database:
             conn.close()
             return stats
         except Exception as e:
-            logger.error(f"Error getting file stats: {e}")
+            logger.error("Error getting file stats: %s", e)
             return (0, 0)
+    
+    def delete_expired_files(self, retention_days, batch_size, user_id=None, exclude_user_ids=()):
+        """Delete one batch of files older than retention_days.
+
+        Returns (deleted row ids, seconds the write lock was held).
+        """
+        conn = None
+        try:
+            conn = self.get_connection()
+            cursor = conn.cursor()
+            
+            query = "SELECT id FROM files WHERE upload_date < datetime('now', ?)"
+            params = [f"-{int(retention_days)} days"]
+            if user_id is not None:
+                query += " AND user_id = ?"
+                params.append(user_id)
+            if exclude_user_ids:
+                query += f" AND user_id NOT IN ({', '.join('?' * len(exclude_user_ids))})"
+                params.extend(exclude_user_ids)
+            query += " ORDER BY upload_date LIMIT ?"
+            params.append(batch_size)
+            
+            # Time from once the lock is ours; waiting for it (up to DB_TIMEOUT)
+            # doesn't block anyone else
+            cursor.execute("BEGIN IMMEDIATE")
+            started = time.perf_counter()
+            cursor.execute(query, params)
+            rows = cursor.fetchall()
+            if rows:
+                cursor.executemany("DELETE FROM files WHERE id = ?", [(row[0],) for row in rows])
+            conn.commit()
+            lock_held = time.perf_counter() - started
+            
+            return [row[0] for row in rows], lock_held
+        except Exception as e:
+            logger.error("Error deleting expired files: %s", e)
+            if conn is not None:
+                conn.rollback()
+            return [], 0.0
+        finally:
+            if conn is not None:
+                conn.close()
+    
+    def incremental_vacuum(self, max_pages):
+        """Release up to max_pages free pages and refresh planner statistics.
+
+        Returns (bytes reclaimed, seconds the write lock was held).
+        """
+        conn = None
+        try:
+            conn = sqlite3.connect(
+                self.db_name, timeout=Config.DB_TIMEOUT, check_same_thread=False, isolation_level=None
+            )
+            cursor = conn.cursor()
+            
+            page_size = cursor.execute("PRAGMA page_size").fetchone()[0]
+            pages_before = cursor.execute("PRAGMA page_count").fetchone()[0]
+            
+            started = time.perf_counter()
+            # executescript steps the pragma to completion; a plain execute()
+            # only frees a single page
+            conn.executescript(f"PRAGMA incremental_vacuum({int(max_pages)});")
+            lock_held = time.perf_counter() - started
+            
+            cursor.execute("PRAGMA optimize")
+            pages_after = cursor.execute("PRAGMA page_count").fetchone()[0]
+            
+            return (pages_before - pages_after) * page_size, lock_held
+        except Exception as e:
+            logger.error("Error running incremental vacuum: %s", e)
+            return 0, 0.0
+        finally:
+            if conn is not None:
+                conn.close()
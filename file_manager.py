@@ -5,22 +5,258 @@ from config import Config
 
 logger = logging.getLogger(__name__)
 
+# Canonical MIME type for each extension we may store
+EXTENSION_MIME_TYPES = {
+    '.jpg': 'image/jpeg',
+    '.jpeg': 'image/jpeg',
+    '.png': 'image/png',
+    '.gif': 'image/gif',
+    '.bmp': 'image/bmp',
+    '.webp': 'image/webp',
+    '.heic': 'image/heic',
+    '.avif': 'image/avif',
+    '.pdf': 'application/pdf',
+    '.doc': 'application/msword',
+    '.docx': 'application/vnd.openxmlformats-officedocument.wordprocessingml.document',
+    '.txt': 'text/plain',
+    '.zip': 'application/zip',
+    '.rar': 'application/vnd.rar',
+    '.7z': 'application/x-7z-compressed',
+    '.mp3': 'audio/mpeg',
+    '.wav': 'audio/wav',
+    '.ogg': 'audio/ogg',
+    '.m4a': 'audio/mp4',
+    '.mp4': 'video/mp4',
+    '.mov': 'video/quicktime',
+    '.avi': 'video/x-msvideo',
+    '.mkv': 'video/x-matroska',
+}
+
+MIME_EXTENSIONS = {}
+for _ext, _mime in EXTENSION_MIME_TYPES.items():
+    MIME_EXTENSIONS.setdefault(_mime, _ext)
+
+# (offset, signature, extension); checked in order, first match wins
+MAGIC_SIGNATURES = (
+    (0, b'\xff\xd8\xff', '.jpg'),
+    (0, b'\x89PNG\r\n\x1a\n', '.png'),
+    (0, b'GIF87a', '.gif'),
+    (0, b'GIF89a', '.gif'),
+    (0, b'%PDF-', '.pdf'),
+    (0, b'\xd0\xcf\x11\xe0\xa1\xb1\x1a\xe1', '.doc'),
+    (0, b'PK\x03\x04', '.zip'),
+    (0, b'Rar!\x1a\x07', '.rar'),
+    (0, b"7z\xbc\xaf'\x1c", '.7z'),
+    (0, b'OggS', '.ogg'),
+    (0, b'ID3', '.mp3'),
+    (0, b'\x1aE\xdf\xa3', '.mkv'),
+    (8, b'WAVE', '.wav'),
+    (8, b'AVI ', '.avi'),
+    (8, b'WEBP', '.webp'),
+)
+
+# BMP files start with 'BM' followed by a DIB header whose size is one of these
+BMP_DIB_HEADER_SIZES = (12, 40, 52, 56, 108, 124)
+
+# ISO base media (ftyp) major brands; unknown brands are left unclassified
+FTYP_BRANDS = {
+    b'isom': '.mp4',
+    b'iso2': '.mp4',
+    b'mp41': '.mp4',
+    b'mp42': '.mp4',
+    b'avc1': '.mp4',
+    b'dash': '.mp4',
+    b'M4V ': '.mp4',
+    b'M4A ': '.m4a',
+    b'qt  ': '.mov',
+    b'heic': '.heic',
+    b'heix': '.heic',
+    b'mif1': '.heic',
+    b'msf1': '.heic',
+    b'avif': '.avif',
+}
+
+# Extensions whose content is indistinguishable by signature alone, mapped
+# to the extension detect_extension reports for them
+CONTENT_ALIASES = {
+    '.jpeg': '.jpg',
+    # OOXML documents are ZIP containers
+    '.docx': '.zip',
+    # Audio-only MP4 files often carry a generic video brand
+    '.m4a': '.mp4',
+    '.mov': '.mp4',
+}
+
+# Bot API servers at api.telegram.org refuse getFile above this size
+BOT_API_DOWNLOAD_LIMIT = 20 * 1024 * 1024
+
+# Category reported for an upload whose content contradicts its name
+CONTENT_MISMATCH = 'mismatch'
+
+# Extensions detect_extension can recognise by a real signature
+_SIGNED_EXTENSIONS = (
+    {ext for _, _, ext in MAGIC_SIGNATURES}
+    | set(FTYP_BRANDS.values())
+    | set(CONTENT_ALIASES)
+    | {'.bmp', '.mp3'}
+)
+_FTYP_EXTENSIONS = set(FTYP_BRANDS.values())
+
+
+def detect_extension(head):
+    """Return the extension implied by a file's leading bytes, or None."""
+    for offset, signature, ext in MAGIC_SIGNATURES:
+        if head[offset:offset + len(signature)] == signature:
+            return ext
+    if head[:2] == b'BM' and int.from_bytes(head[14:18], 'little') in BMP_DIB_HEADER_SIZES:
+        return '.bmp'
+    if head[4:8] == b'ftyp':
+        return FTYP_BRANDS.get(head[8:12])
+    # Bare MPEG audio frame without an ID3 tag
+    if len(head) > 1 and head[0] == 0xff and head[1] & 0xe0 == 0xe0:
+        return '.mp3'
+    if head and b'\x00' not in head:
+        try:
+            head.decode('utf-8')
+            return '.txt'
+        except UnicodeDecodeError:
+            # The cut may land mid-character; retry without the last few bytes
+            try:
+                head[:-3].decode('utf-8')
+                return '.txt'
+            except UnicodeDecodeError:
+                pass
+    return None
+
+
 class FileManager:
     def __init__(self):
         self.storage_dir = Config.STORAGE_DIR
-    
+        self._allowed = None
+        self._extension_categories = {}
+        self._http = None
+
+    def _category_map(self):
+        # Rebuilt only when a config reload swaps in a new ALLOWED_EXTENSIONS
+        if self._allowed is not Config.ALLOWED_EXTENSIONS:
+            self._extension_categories = {
+                ext: category
+                for category, extensions in Config.ALLOWED_EXTENSIONS.items()
+                for ext in extensions
+            }
+            self._allowed = Config.ALLOWED_EXTENSIONS
+        return self._extension_categories
+
     def is_file_allowed(self, file_name):
         """Check if file extension is allowed"""
         try:
             ext = os.path.splitext(file_name)[1].lower()
-            for category, extensions in Config.ALLOWED_EXTENSIONS.items():
-                if ext in extensions:
-                    return True, category
+            category = self._category_map().get(ext)
+            if category:
+                return True, category
             return False, 'unknown'
         except Exception as e:
-            logger.error(f"Error checking file allowance: {e}")
+            logger.error("Error checking file allowance: %s", e)
             return False, 'unknown'
-    
+
+    def extension_for_mime(self, mime_type, default):
+        """Pick a file name extension for a Telegram-reported MIME type."""
+        return MIME_EXTENSIONS.get(mime_type, default)
+
+    def classify_head(self, head, file_name):
+        """Check a file's leading bytes against its name.
+
+        The name's extension must be allowed. Content of another allowed type
+        is kept and typed by what it really is; content that is not allowed,
+        or that lacks the signature its name promises, is rejected with the
+        CONTENT_MISMATCH category. Returns (is_allowed, category, mime_type),
+        or None when the bytes neither confirm nor contradict the name.
+        """
+        detected = detect_extension(head)
+        claimed = os.path.splitext(file_name or '')[1].lower()
+        category = self._category_map().get(claimed)
+        if category is None:
+            return False, 'unknown', EXTENSION_MIME_TYPES.get(detected)
+
+        if detected is None:
+            # An unlisted ftyp brand is still ISO media; trust the name
+            if head[4:8] == b'ftyp' and claimed in _FTYP_EXTENSIONS:
+                return None
+            if claimed == '.txt' or claimed in _SIGNED_EXTENSIONS:
+                return False, CONTENT_MISMATCH, None
+            return None
+
+        if detected == '.txt' and claimed not in _SIGNED_EXTENSIONS:
+            # Only a heuristic: text-based formats keep their own type
+            return True, category, EXTENSION_MIME_TYPES.get(claimed, 'text/plain')
+        if detected == claimed or CONTENT_ALIASES.get(claimed) == detected:
+            # Same type, or a more specific format inside the detected container
+            return True, category, EXTENSION_MIME_TYPES.get(claimed, EXTENSION_MIME_TYPES[detected])
+
+        detected_category = self._category_map().get(detected)
+        if detected_category is not None:
+            # An allowed type under the wrong name, e.g. a PNG saved as .jpg
+            return True, detected_category, EXTENSION_MIME_TYPES[detected]
+        return False, CONTENT_MISMATCH, EXTENSION_MIME_TYPES[detected]
+
+    async def fetch_head(self, bot, file_id, size):
+        """Fetch only the first size bytes of a Telegram file."""
+        tg_file = await bot.get_file(file_id)
+        path = tg_file.file_path
+
+        # Local Bot API servers hand back a filesystem path
+        if not path.startswith(('http://', 'https://')):
+            with open(path, 'rb') as f:
+                return f.read(size)
+
+        if self._http is None:
+            import httpx
+            self._http = httpx.AsyncClient(timeout=Config.READ_TIMEOUT)
+
+        head = bytearray()
+        async with self._http.stream('GET', path, headers={'Range': f"bytes=0-{size - 1}"}) as response:
+            # Not raise_for_status(): its message carries the URL, and with it the bot token
+            if response.status_code not in (200, 206):
+                raise RuntimeError(f"download failed with HTTP {response.status_code}")
+            # Servers that ignore Range send the whole file; stop reading early
+            async for chunk in response.aiter_bytes():
+                head += chunk
+                if len(head) >= size:
+                    break
+        return bytes(head[:size])
+
+    async def classify(self, bot, file, file_name):
+        """Return (is_allowed, category, file_type) for an incoming file.
+
+        The extension lookup always decides what is allowed; with
+        CONTENT_SNIFFING enabled the first SNIFF_BYTES of an allowed file are
+        also checked against known signatures (see classify_head), and the
+        content's MIME type replaces the client-reported one.
+        """
+        is_allowed, category = self.is_file_allowed(file_name)
+        file_type = getattr(file, 'mime_type', None) or \
+            EXTENSION_MIME_TYPES.get(os.path.splitext(file_name or '')[1].lower(), category)
+
+        if not Config.CONTENT_SNIFFING or not is_allowed:
+            return is_allowed, category, file_type
+        # Only a Bot API server running with --local lifts the download limit
+        if not Config.BOT_API_LOCAL_MODE and (file.file_size or 0) > BOT_API_DOWNLOAD_LIMIT:
+            return is_allowed, category, file_type
+
+        try:
+            head = await self.fetch_head(bot, file.file_id, Config.SNIFF_BYTES)
+            sniffed = self.classify_head(head, file_name)
+            if sniffed is not None:
+                return sniffed
+        except Exception as e:
+            logger.warning("Content sniffing failed for %s: %s", file_name, e)
+        return is_allowed, category, file_type
+
+    async def close(self):
+        if self._http is not None:
+            await self._http.aclose()
+            self._http = None
+
     def format_file_size(self, size_bytes):
         """Convert bytes to human readable format"""
         try:
@@ -33,5 +269,5 @@ class FileManager:
                 i += 1
             return f"{size_bytes:.2f} {size_names[i]}"
         except Exception as e:
-            logger.error(f"Error formatting file size: {e}")
+            logger.error("Error formatting file size: %s", e)
             return "Unknown"
@@ -0,0 +1,176 @@
+import time
+import queue
+import atexit
+import random
+import logging
+import contextvars
+from contextlib import contextmanager
+from logging.handlers import QueueHandler, QueueListener
+
+LOG_FORMAT = '%(asctime)s - %(name)s - %(levelname)s - [update=%(update_id)s user=%(user_id)s] %(message)s'
+
+# Per-update fields, set once per incoming update and read by every log call in that task
+_request_context = contextvars.ContextVar('request_context', default=None)
+
+_listener = None
+_sampling_filter = None
+
+
+class RequestContextFilter(logging.Filter):
+    """Attach the current update's id, user id and stage timings to each record."""
+
+    def filter(self, record):
+        ctx = _request_context.get()
+        if ctx is None:
+            record.update_id = '-'
+            record.user_id = '-'
+            record.stages = None
+        else:
+            record.update_id = ctx['update_id']
+            record.user_id = ctx['user_id']
+            record.stages = dict(ctx['stages']) if ctx['stages'] else None
+        return True
+
+
+class SamplingFilter(logging.Filter):
+    """Keep only a fraction of high-volume INFO records.
+
+    A record is sampled when it is logged with extra={'sample': True} or
+    comes from one of sampled_loggers. Warnings and errors always pass.
+    """
+
+    def __init__(self, rate=1.0, sampled_loggers=('httpx',)):
+        super().__init__()
+        self.rate = rate
+        self.sampled_loggers = tuple(sampled_loggers)
+
+    def filter(self, record):
+        if self.rate >= 1.0 or record.levelno > logging.INFO:
+            return True
+        if getattr(record, 'sample', False) or record.name.startswith(self.sampled_loggers):
+            return random.random() < self.rate
+        return True
+
+
+class StageFormatter(logging.Formatter):
+    def format(self, record):
+        text = super().format(record)
+        stages = getattr(record, 'stages', None)
+        if stages:
+            text += ' stages=' + ','.join(f"{name}:{ms:.1f}ms" for name, ms in stages.items())
+        return text
+
+
+class _InProcessQueueHandler(QueueHandler):
+    def prepare(self, record):
+        # The stock prepare() formats the message on the caller's thread so the
+        # record can be pickled. The listener lives in this process, so pass the
+        # record through untouched and let the writer thread do the formatting.
+        return record
+
+
+def setup_logging(level=logging.INFO, sample_rate=1.0, handler=None):
+    """Route all logging through a queue drained by a background writer thread."""
+    global _listener, _sampling_filter
+
+    if _listener is not None:
+        return _listener
+
+    if handler is None:
+        handler = logging.StreamHandler()
+    handler.setFormatter(StageFormatter(LOG_FORMAT))
+
+    log_queue = queue.SimpleQueue()
+    queue_handler = _InProcessQueueHandler(log_queue)
+    _sampling_filter = SamplingFilter(sample_rate)
+    queue_handler.addFilter(_sampling_filter)
+    queue_handler.addFilter(RequestContextFilter())
+
+    root = logging.getLogger()
+    for existing in root.handlers[:]:
+        root.removeHandler(existing)
+    root.addHandler(queue_handler)
+    root.setLevel(level)
+
+    _listener = QueueListener(log_queue, handler, respect_handler_level=True)
+    _listener.start()
+    atexit.register(stop_logging)
+    return _listener
+
+
+def set_log_level(level, sample_rate=None):
+    """Change the root level and sampling rate of a running pipeline."""
+    logging.getLogger().setLevel(level)
+    if sample_rate is not None and _sampling_filter is not None:
+        _sampling_filter.rate = sample_rate
+
+
+def stop_logging():
+    """Flush queued records and stop the writer thread."""
+    global _listener
+
+    if _listener is not None:
+        _listener.stop()
+        _listener = None
+
+
+def bind_update(update):
+    """Start a request context for an incoming Telegram update."""
+    user = getattr(update, 'effective_user', None)
+    ctx = {
+        'update_id': getattr(update, 'update_id', '-'),
+        'user_id': user.id if user else '-',
+        'started': time.perf_counter(),
+        'stages': {},
+    }
+    ctx['token'] = _request_context.set(ctx)
+
+
+def unbind_update():
+    """End the current request context so later records aren't tagged with it."""
+    ctx = _request_context.get()
+    if ctx is None:
+        return
+    try:
+        _request_context.reset(ctx['token'])
+    except ValueError:
+        # Bound in a different task's context; just clear it here
+        _request_context.set(None)
+
+
+def request_elapsed_ms():
+    ctx = _request_context.get()
+    if ctx is None:
+        return 0.0
+    return (time.perf_counter() - ctx['started']) * 1000
+
+
+@contextmanager
+def log_stage(name):
+    """Time a block and record it as a stage of the current request."""
+    started = time.perf_counter()
+    try:
+        yield
+    finally:
+        ctx = _request_context.get()
+        if ctx is not None:
+            ctx['stages'][name] = (time.perf_counter() - started) * 1000
+
+
+def install_request_context(application):
+    """Bind every update to a request context before any handler runs and log a summary afterwards."""
+    from telegram import Update
+    from telegram.ext import TypeHandler
+
+    logger = logging.getLogger('updates')
+
+    async def _bind(update, context):
+        bind_update(update)
+
+    async def _summary(update, context):
+        logger.info("Handled update in %.1fms", request_elapsed_ms(), extra={'sample': True})
+        # With sequential processing every update runs in the same task
+        unbind_update()
+
+    application.add_handler(TypeHandler(Update, _bind), group=-1000)
+    application.add_handler(TypeHandler(Update, _summary), group=1000)
@@ -2,20 +2,19 @@ import logging
 import requests
 from telegram import Update
 from telegram.ext import Application, CommandHandler, MessageHandler, filters, ContextTypes
-from config import BOT_TOKEN, REMOVE_BG_API_KEY, REMOVE_BG_URL
+from config import Config
+from log_setup import setup_logging, install_request_context, log_stage
 import io
 import os
 
 # Set up logging
-logging.basicConfig(
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    level=logging.INFO
-)
+setup_logging(Config.LOG_LEVEL, Config.LOG_SAMPLE_RATE)
 logger = logging.getLogger(__name__)
 
 class BackgroundRemoverBot:
     def __init__(self):
-        self.application = Application.builder().token(BOT_TOKEN).build()
+        self.application = Application.builder().token(Config.BOT_TOKEN).build()
+        install_request_context(self.application)
         self.setup_handlers()
     
     def setup_handlers(self):
@@ -81,35 +80,38 @@ Use /help for more information.
             # Send processing message
             processing_msg = await update.message.reply_text("🔄 Processing your image...")
             
-            # Get the highest quality photo
-            photo_file = await update.message.photo[-1].get_file()
-            
-            # Download photo
-            photo_bytes = await photo_file.download_as_bytearray()
+            with log_stage('download'):
+                # Get the highest quality photo
+                photo_file = await update.message.photo[-1].get_file()
+                
+                # Download photo
+                photo_bytes = await photo_file.download_as_bytearray()
             
             # Remove background
-            result_image = await self.remove_background(photo_bytes)
+            with log_stage('remove_bg'):
+                result_image = await self.remove_background(photo_bytes)
             
             if result_image:
                 # Send the processed image
-                await update.message.reply_document(
-                    document=io.BytesIO(result_image),
-                    filename="background_removed.png",
-                    caption="✅ Background removed successfully!"
-                )
+                with log_stage('reply'):
+                    await update.message.reply_document(
+                        document=io.BytesIO(result_image),
+                        filename="background_removed.png",
+                        caption="✅ Background removed successfully!"
+                    )
                 await processing_msg.delete()
             else:
                 await processing_msg.edit_text("❌ Failed to remove background. Please try again with a different image.")
         
         except Exception as e:
-            logger.error(f"Error processing image: {e}")
+            logger.error("Error processing image: %s", e)
             await update.message.reply_text("❌ An error occurred while processing your image. Please try again.")
     
     async def remove_background(self, image_bytes: bytearray) -> bytes:
         """Remove background using remove.bg API"""
         try:
             headers = {
-                'X-Api-Key': REMOVE_BG_API_KEY,
+                'X-Api-Key': Config.REMOVE_BG_API_KEY,
             }
             
             # Convert bytearray to bytes for requests
@@ -123,30 +125,30 @@ Use /help for more information.
                 'size': 'auto'
             }
             
-            logger.info("Sending request to remove.bg API...")
+            logger.info("Sending request to remove.bg API...", extra={'sample': True})
             
             response = requests.post(
-                REMOVE_BG_URL,
+                Config.REMOVE_BG_URL,
                 headers=headers,
                 files=files,
                 data=data,
-                timeout=60
+                timeout=Config.REMOVE_BG_TIMEOUT
             )
             
-            logger.info(f"API Response Status: {response.status_code}")
+            logger.info("API Response Status: %s", response.status_code, extra={'sample': True})
             
             if response.status_code == 200:
-                logger.info("Background removed successfully!")
+                logger.info("Background removed successfully!", extra={'sample': True})
                 return response.content
             else:
-                logger.error(f"Remove.bg API error: {response.status_code} - {response.text}")
+                logger.error("Remove.bg API error: %s - %s", response.status_code, response.text)
                 return None
                 
         except requests.exceptions.RequestException as e:
-            logger.error(f"Request error: {e}")
+            logger.error("Request error: %s", e)
             return None
         except Exception as e:
-            logger.error(f"Unexpected error in remove_background: {e}")
+            logger.error("Unexpected error in remove_background: %s", e)
             return None
     
     def run(self):
@@ -154,7 +156,7 @@ Use /help for more information.
         logger.info("Bot is starting...")
         
         # Validate API keys
-        if not BOT_TOKEN or not REMOVE_BG_API_KEY:
+        if not Config.BOT_TOKEN or not Config.REMOVE_BG_API_KEY:
             logger.error("Missing API keys! Please check your .env file")
             return
         
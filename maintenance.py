@@ -0,0 +1,90 @@
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+
+class MaintenanceJob:
+    def __init__(self, db, thumbnails=None, retention_days=None, user_retention_days=None,
+                 pending_upload_ttl=3600, batch_size=200, batch_pause=0.05, vacuum_pages=1000):
+        self.db = db
+        self.thumbnails = thumbnails
+        # None disables global retention; per-user values override it
+        self.retention_days = retention_days
+        self.user_retention_days = user_retention_days or {}
+        self.pending_upload_ttl = pending_upload_ttl
+        self.batch_size = batch_size
+        self.batch_pause = batch_pause
+        self.vacuum_pages = vacuum_pages
+        self._job = None
+
+    def schedule(self, job_queue, interval=3600, first=60):
+        """Register the job on PTB's JobQueue, replacing any earlier schedule."""
+        if job_queue is None:
+            logger.warning("JobQueue unavailable, install python-telegram-bot[job-queue] to enable maintenance")
+            return
+        if self._job is not None:
+            self._job.schedule_removal()
+        self._job = job_queue.run_repeating(self.run, interval=interval, first=first, name="maintenance")
+
+    async def run(self, context):
+        """Apply retention, expire pending uploads and reclaim free pages."""
+        try:
+            started = time.perf_counter()
+            expired_uploads = self.expire_pending_uploads(context.application)
+
+            deleted = 0
+            max_lock = 0.0
+            for retention_days, user_id, exclude in self._retention_rules():
+                count, lock_held = await self._delete_expired(retention_days, user_id, exclude)
+                deleted += count
+                max_lock = max(max_lock, lock_held)
+
+            reclaimed, vacuum_lock = await asyncio.to_thread(self.db.incremental_vacuum, self.vacuum_pages)
+
+            logger.info(
+                "🧹 Maintenance finished in %.2fs: deleted %d files, expired %d pending uploads, "
+                "reclaimed %d bytes, max delete lock %.1fms, vacuum lock %.1fms",
+                time.perf_counter() - started, deleted, expired_uploads,
+                reclaimed, max_lock * 1000, vacuum_lock * 1000
+            )
+        except Exception as e:
+            logger.error("Error running maintenance: %s", e)
+
+    def _retention_rules(self):
+        for user_id, days in self.user_retention_days.items():
+            if days is not None:
+                yield days, user_id, ()
+        if self.retention_days is not None:
+            yield self.retention_days, None, tuple(self.user_retention_days)
+
+    async def _delete_expired(self, retention_days, user_id, exclude):
+        """Delete in small batches so no single transaction holds the write lock for long."""
+        deleted = 0
+        max_lock = 0.0
+        while True:
+            file_db_ids, lock_held = await asyncio.to_thread(
+                self.db.delete_expired_files, retention_days, self.batch_size, user_id, exclude
+            )
+            max_lock = max(max_lock, lock_held)
+            deleted += len(file_db_ids)
+            if self.thumbnails is not None:
+                for file_db_id in file_db_ids:
+                    self.thumbnails.discard(file_db_id)
+            if len(file_db_ids) < self.batch_size:
+                return deleted, max_lock
+            # Give queued handler writes a chance to grab the lock
+            await asyncio.sleep(self.batch_pause)
+
+    def expire_pending_uploads(self, application):
+        """Drop pending uploads whose description was never sent."""
+        expired = 0
+        cutoff = time.time() - self.pending_upload_ttl
+        for user_data in application.user_data.values():
+            pending_file = user_data.get('pending_file')
+            if pending_file and pending_file.get('created_at', 0) < cutoff:
+                user_data['waiting_for_description'] = False
+                user_data['pending_file'] = None
+                expired += 1
+        return expired
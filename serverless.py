@@ -0,0 +1,113 @@
+"""Single-update webhook entry point for short-lived containers and functions.
+
+Each invocation receives one Telegram webhook update and processes it
+before returning. Heavy imports and the bot itself are created on the
+first invocation and reused while the container stays warm.
+
+Conversation state such as a pending upload lives in memory, so it
+only survives between invocations that land on the same warm container.
+"""
+import os
+import sys
+import json
+import time
+import asyncio
+import logging
+
+logger = logging.getLogger(__name__)
+
+_loop = None
+_bot = None
+
+
+def _get_loop():
+    # PTB's HTTP client is bound to the loop it was initialised on, so warm
+    # invocations must reuse the same loop
+    global _loop
+    if _loop is None or _loop.is_closed():
+        _loop = asyncio.new_event_loop()
+        asyncio.set_event_loop(_loop)
+    return _loop
+
+
+async def _get_bot():
+    global _bot
+    if _bot is None:
+        started = time.perf_counter()
+        if 'telegram.ext' not in sys.modules:
+            # telegram.ext pulls in APScheduler for its JobQueue when it is
+            # installed. A single-update invocation never schedules jobs, so
+            # make that optional import fail and skip its cost.
+            sys.modules.setdefault('apscheduler', None)
+        from bot import TelegramFileBot
+        imported = time.perf_counter()
+
+        bot = TelegramFileBot(serverless=True)
+        await bot.application.initialize()
+        initialized = time.perf_counter()
+
+        logger.info(
+            "Cold start: imports %.1fms, init %.1fms",
+            (imported - started) * 1000, (initialized - imported) * 1000
+        )
+        _bot = bot
+    return _bot
+
+
+async def process_update(payload):
+    """Process one webhook update and wait for any background work it started."""
+    started = time.perf_counter()
+    bot = await _get_bot()
+
+    from telegram import Update
+
+    from log_setup import unbind_update
+
+    update = Update.de_json(payload, bot.application.bot)
+    try:
+        await bot.application.process_update(update)
+        await bot.thumbnails.drain()
+    finally:
+        # Warm invocations share the loop; don't tag the next one with this update
+        unbind_update()
+    logger.info("Update processed in %.1fms", (time.perf_counter() - started) * 1000)
+
+
+def _extract_payload(event):
+    """Accept a raw update dict or an HTTP-style event with a JSON body."""
+    if isinstance(event, dict) and 'body' in event:
+        body = event['body']
+        if isinstance(body, (bytes, bytearray)):
+            body = body.decode('utf-8')
+        return json.loads(body) if isinstance(body, str) else body
+    if isinstance(event, (str, bytes, bytearray)):
+        return json.loads(event)
+    return event
+
+
+def _check_secret(event):
+    secret = os.getenv('WEBHOOK_SECRET')
+    if not secret:
+        return True
+    headers = (event.get('headers') or {}) if isinstance(event, dict) else {}
+    received = {k.lower(): v for k, v in headers.items()}.get('x-telegram-bot-api-secret-token')
+    return received == secret
+
+
+def handler(event, context=None):
+    """Function entry point: process the update carried by event."""
+    try:
+        if not _check_secret(event):
+            return {'statusCode': 403, 'body': 'forbidden'}
+        payload = _extract_payload(event)
+        _get_loop().run_until_complete(process_update(payload))
+        return {'statusCode': 200, 'body': 'ok'}
+    except Exception as e:
+        logger.error("Error processing webhook update: %s", e)
+        # Telegram retries non-2xx responses; a poison update would loop forever
+        return {'statusCode': 200, 'body': 'error'}
+
+
+if __name__ == '__main__':
+    # Process one update read from stdin, e.g. for local testing
+    print(json.dumps(handler(sys.stdin.read())))
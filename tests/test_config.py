@@ -0,0 +1,44 @@
+import os
+
+import config
+from config import Settings, reload_config
+
+
+def _use_file(monkeypatch, tmp_path, text):
+    path = tmp_path / '.env'
+    path.write_text(text)
+    monkeypatch.setattr(config, '_dotenv_path', str(path))
+    monkeypatch.setattr(config, '_base_environ', {})
+    monkeypatch.setattr(config, '_reload_callbacks', [])
+    monkeypatch.setattr(config, 'Config', Settings())
+    return path
+
+
+def test_reload_recovers_after_rejected_value(monkeypatch, tmp_path):
+    path = _use_file(monkeypatch, tmp_path, "THUMBNAIL_WORKERS=0\n")
+    assert reload_config() == set()
+    assert config.Config.THUMBNAIL_WORKERS == 2
+    assert 'THUMBNAIL_WORKERS' not in os.environ
+
+    path.write_text("THUMBNAIL_WORKERS=4\n")
+    assert reload_config() == {'THUMBNAIL_WORKERS'}
+    assert config.Config.THUMBNAIL_WORKERS == 4
+
+
+def test_reload_restores_default_for_removed_key(monkeypatch, tmp_path):
+    path = _use_file(monkeypatch, tmp_path, "LOG_SAMPLE_RATE=0.5\n")
+    reload_config()
+    assert config.Config.LOG_SAMPLE_RATE == 0.5
+
+    path.write_text("")
+    assert reload_config() == {'LOG_SAMPLE_RATE'}
+    assert config.Config.LOG_SAMPLE_RATE == 1.0
+
+
+def test_invalid_bool_and_empty_category_are_rejected(monkeypatch, tmp_path):
+    _use_file(monkeypatch, tmp_path, "CONTENT_SNIFFING=maybe\n")
+    assert reload_config() == set()
+
+    _use_file(monkeypatch, tmp_path, "ALLOWED_EXTENSIONS=images\n")
+    assert reload_config() == set()
+    assert config.Config.ALLOWED_EXTENSIONS == config.DEFAULT_ALLOWED_EXTENSIONS
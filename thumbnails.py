@@ -0,0 +1,218 @@
+import os
+import io
+import asyncio
+import logging
+import threading
+
+logger = logging.getLogger(__name__)
+
+# Telegram accepts at most 10 items in a single media group
+MAX_MEDIA_GROUP_SIZE = 10
+
+
+def render_thumbnail(image_bytes, size, quality):
+    """Render a JPEG thumbnail. Runs inside a worker process."""
+    from PIL import Image, ImageOps
+
+    with Image.open(io.BytesIO(image_bytes)) as img:
+        # Let the JPEG decoder downscale while decoding instead of
+        # materialising the full-resolution bitmap first
+        img.draft('RGB', (size, size))
+        img = ImageOps.exif_transpose(img)
+        if img.mode != 'RGB':
+            img = img.convert('RGB')
+        img.thumbnail((size, size))
+        out = io.BytesIO()
+        img.save(out, format='JPEG', quality=quality, optimize=True)
+        return out.getvalue()
+
+
+class ThumbnailManager:
+    def __init__(self, cache_dir, max_cache_bytes=64 * 1024 * 1024,
+                 size=320, quality=80, workers=2, max_source_size=5 * 1024 * 1024):
+        self.cache_dir = cache_dir
+        self.max_cache_bytes = max_cache_bytes
+        self.size = size
+        self.quality = quality
+        self.workers = workers
+        self.max_source_size = max_source_size
+        self._pool = None
+        self._pending = set()
+        self._tasks = set()
+        # Scanned on first write rather than at startup to keep cold starts cheap
+        self._cache_bytes = None
+        self._lock = threading.Lock()
+
+    def _scan_cache_size(self):
+        total = 0
+        try:
+            with os.scandir(self.cache_dir) as entries:
+                for entry in entries:
+                    if entry.is_file():
+                        total += entry.stat().st_size
+        except Exception as e:
+            logger.error("Error scanning thumbnail cache: %s", e)
+        return total
+
+    def _get_pool(self):
+        if self._pool is None:
+            # multiprocessing is only imported once a thumbnail is actually rendered
+            from concurrent.futures import ProcessPoolExecutor
+            self._pool = ProcessPoolExecutor(max_workers=self.workers)
+        return self._pool
+
+    def set_workers(self, workers):
+        """Resize the worker pool; the new pool starts with the next thumbnail."""
+        if workers != self.workers:
+            self.workers = workers
+            old_pool, self._pool = self._pool, None
+            if old_pool is not None:
+                # Let renders already queued on the old pool finish
+                old_pool.shutdown(wait=False, cancel_futures=False)
+
+    def shutdown(self):
+        """Stop the worker processes."""
+        if self._pool is not None:
+            self._pool.shutdown(wait=False, cancel_futures=True)
+            self._pool = None
+
+    def cache_path(self, file_db_id):
+        """Return the on-disk cache path for a stored file's database id."""
+        # Keyed by row rather than Telegram file_id so the same file stored
+        # twice gets independent entries
+        return os.path.join(self.cache_dir, f"{int(file_db_id)}.jpg")
+
+    def has_cached(self, file_db_id):
+        return os.path.exists(self.cache_path(file_db_id))
+
+    def is_pending(self, file_db_id):
+        return file_db_id in self._pending
+
+    def get_cached(self, file_db_id):
+        """Return the cached thumbnail path, or None if it is not cached."""
+        path = self.cache_path(file_db_id)
+        try:
+            # Bump the mtime so eviction drops the least recently viewed first
+            os.utime(path)
+            return path
+        except FileNotFoundError:
+            return None
+        except Exception as e:
+            logger.error("Error reading thumbnail cache: %s", e)
+            return None
+
+    def discard(self, file_db_id):
+        """Drop a cached thumbnail, e.g. after its file was deleted."""
+        path = self.cache_path(file_db_id)
+        try:
+            size = os.path.getsize(path)
+            os.remove(path)
+            with self._lock:
+                if self._cache_bytes is not None:
+                    self._cache_bytes -= size
+        except FileNotFoundError:
+            pass
+        except Exception as e:
+            logger.error("Error discarding thumbnail: %s", e)
+
+    def select_source(self, message):
+        """Pick the smallest Telegram file that still yields a full-size thumbnail."""
+        if message.photo:
+            for photo in message.photo:
+                if max(photo.width, photo.height) >= self.size:
+                    return photo.file_id
+            return message.photo[-1].file_id
+        if message.video:
+            thumb = message.video.thumbnail
+            return thumb.file_id if thumb else None
+        document = message.document
+        if document:
+            if document.thumbnail:
+                return document.thumbnail.file_id
+            mime_type = document.mime_type or ''
+            if mime_type.startswith('image/') and (document.file_size or 0) <= self.max_source_size:
+                return document.file_id
+        return None
+
+    def schedule(self, bot, file_db_id, source_file_id):
+        """Generate a thumbnail in the background without blocking the handler."""
+        if not source_file_id or file_db_id in self._pending:
+            return
+        if self.has_cached(file_db_id):
+            return
+        self._pending.add(file_db_id)
+        # A plain asyncio task: serverless invocations never start the
+        # Application, and Application.create_task warns when it isn't running
+        task = asyncio.create_task(self.generate(bot, file_db_id, source_file_id))
+        self._tasks.add(task)
+        task.add_done_callback(self._tasks.discard)
+
+    async def drain(self):
+        """Wait for scheduled thumbnails, for runtimes that freeze between requests."""
+        if self._tasks:
+            await asyncio.gather(*self._tasks, return_exceptions=True)
+
+    async def generate(self, bot, file_db_id, source_file_id):
+        self._pending.add(file_db_id)
+        try:
+            tg_file = await bot.get_file(source_file_id)
+            data = await tg_file.download_as_bytearray()
+
+            loop = asyncio.get_running_loop()
+            thumb = await loop.run_in_executor(
+                self._get_pool(), render_thumbnail, bytes(data), self.size, self.quality
+            )
+            await loop.run_in_executor(None, self._store, file_db_id, thumb)
+        except asyncio.CancelledError:
+            logger.warning("Thumbnail generation for %s was cancelled", file_db_id)
+            raise
+        except Exception as e:
+            logger.error("Error generating thumbnail for %s: %s", file_db_id, e)
+        finally:
+            self._pending.discard(file_db_id)
+
+    def _store(self, file_db_id, thumb):
+        os.makedirs(self.cache_dir, exist_ok=True)
+        path = self.cache_path(file_db_id)
+        tmp_path = f"{path}.tmp"
+        with open(tmp_path, 'wb') as f:
+            f.write(thumb)
+        with self._lock:
+            try:
+                # Regenerating over an existing entry replaces its bytes
+                old_size = os.path.getsize(path)
+            except FileNotFoundError:
+                old_size = 0
+            os.replace(tmp_path, path)
+            if self._cache_bytes is None:
+                self._cache_bytes = self._scan_cache_size()
+            else:
+                self._cache_bytes += len(thumb) - old_size
+            if self._cache_bytes > self.max_cache_bytes:
+                self._evict()
+
+    def _evict(self):
+        """Remove least recently used thumbnails until the cache fits its budget."""
+        try:
+            entries = []
+            with os.scandir(self.cache_dir) as it:
+                for entry in it:
+                    if entry.is_file() and entry.name.endswith('.jpg'):
+                        stat = entry.stat()
+                        entries.append((stat.st_mtime, stat.st_size, entry.path))
+            entries.sort()
+
+            total = sum(size for _, size, _ in entries)
+            # Evict down to 90% so we don't rescan on every subsequent write
+            target = self.max_cache_bytes * 0.9
+            for _, size, path in entries:
+                if total <= target:
+                    break
+                try:
+                    os.remove(path)
+                    total -= size
+                except FileNotFoundError:
+                    total -= size
+            self._cache_bytes = total
+        except Exception as e:
+            logger.error("Error evicting thumbnails: %s", e)